@@ -14,33 +14,351 @@ Features:
 - Error handling
 """
 
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, make_response, render_template, request, jsonify, session
+from flask.json.provider import JSONProvider
+from flask_compress import Compress
+from flask_session import Session
+import aiohttp
 import asyncio
+import atexit
+import concurrent.futures
+import math
 import os
-import json
-from datetime import datetime
+import orjson
+import sys
+import threading
+from datetime import datetime, timedelta
 import logging
+import redis
+from browser_pool import pool
 from playwright_erp_scraper import scrape_student_data
 
+if sys.platform != 'win32':
+    import uvloop
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson, which encodes straight to UTF-8 bytes"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS),
+            mimetype='application/json'
+        )
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+
+# Attendance tables are repetitive text and compress well for mobile clients
+app.config.update(
+    COMPRESS_MIMETYPES=['application/json', 'text/html'],
+    COMPRESS_LEVEL=5,
+    COMPRESS_MIN_SIZE=500
+)
+Compress(app)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'your-secret-key-here')
 
+# Request bodies only ever carry roll numbers; reject anything larger
+# before it is read and parsed (2 KB leaves room for a full batch)
+app.config['MAX_CONTENT_LENGTH'] = 2048
+
+# Keep session data server-side in Redis so the cookie only carries a
+# session id instead of the whole cached student payload. Without
+# REDIS_URL (local development) Flask's signed-cookie sessions are used.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    app.config.update(
+        SESSION_TYPE='redis',
+        SESSION_REDIS=redis.Redis.from_url(REDIS_URL),
+        PERMANENT_SESSION_LIFETIME=timedelta(hours=1)
+    )
+    Session(app)
+
+# Recent scrape results, shared by every endpoint and worker process
+SCRAPE_CACHE_TTL = int(os.environ.get('SCRAPE_CACHE_TTL', 300))
+cache = redis.Redis.from_url(REDIS_URL, decode_responses=True) if REDIS_URL else None
+
+# Seconds a student's own session copy is served without re-fetching
+SESSION_CACHE_TTL = int(os.environ.get('SESSION_CACHE_TTL', 60))
+
+# Most roll numbers accepted by the batch endpoint
+MAX_BATCH_SIZE = 20
+
+# Seconds a request thread waits for a scrape before giving up
+SCRAPE_TIMEOUT = int(os.environ.get('SCRAPE_TIMEOUT', 60))
+
+# Long-lived event loop owning the browser pool. Request threads hand
+# their coroutines to it instead of building a loop per request, so warm
+# browsers and keep-alive connections survive between requests.
+loop = uvloop.new_event_loop() if sys.platform != 'win32' else asyncio.new_event_loop()
+threading.Thread(target=loop.run_forever, name='asyncio-loop', daemon=True).start()
+app.config['LOOP'] = loop
+
+def run_async(coro, timeout=None):
+    """Run a coroutine on the shared event loop and wait for its result"""
+    future = asyncio.run_coroutine_threadsafe(coro, app.config['LOOP'])
+    try:
+        return future.result(timeout=timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise TimeoutError(f'Operation timed out after {timeout} seconds')
+
+# Scrapes currently running, keyed by roll number. Only touched from the
+# shared loop thread, so the lookup-then-insert below cannot race.
+_inflight = {}
+
+async def get_or_scrape(roll_number):
+    """Scrape via the pool, joining an identical scrape already in flight"""
+    future = _inflight.get(roll_number)
+    if future is None:
+        future = asyncio.ensure_future(scrape_student_data(roll_number))
+        _inflight[roll_number] = future
+        future.add_done_callback(lambda _: _inflight.pop(roll_number, None))
+    else:
+        logger.info(f"Joining in-flight scrape for roll number: {roll_number}")
+    # Shield so one caller timing out does not cancel the scrape for the rest
+    return await asyncio.shield(future)
+
+def json_body():
+    """Return the request's JSON object body, or {} if it is missing or not an object"""
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else {}
+
+def _recent(fetch_time):
+    """Check whether an ISO timestamp stored in the session is within SESSION_CACHE_TTL"""
+    if not fetch_time:
+        return False
+    try:
+        return datetime.now() - datetime.fromisoformat(fetch_time) < timedelta(seconds=SESSION_CACHE_TTL)
+    except ValueError:
+        return False
+
+def _cache_get(roll_number):
+    """Return a cached scrape result, or None on a miss or when caching is off"""
+    if cache is None:
+        return None
+    try:
+        cached = cache.get(f"scrape:{roll_number}")
+    except redis.RedisError as e:
+        logger.warning(f"Scrape cache lookup failed: {e}")
+        return None
+    if cached:
+        logger.info(f"Serving cached scrape for roll number: {roll_number}")
+        return orjson.loads(cached)
+    return None
+
+def _cache_set(roll_number, result):
+    """Cache a successful scrape result"""
+    if cache is None or not result.get('success'):
+        return
+    try:
+        cache.setex(f"scrape:{roll_number}", SCRAPE_CACHE_TTL, orjson.dumps(result))
+    except redis.RedisError as e:
+        logger.warning(f"Scrape cache store failed: {e}")
+
+def get_scrape_result(roll_number, fresh=False):
+    """
+    Scrape a student, serving results from the Redis cache when recent.
+    Pass fresh=True to bypass the cache and always hit the ERP.
+    """
+    if not fresh:
+        cached = _cache_get(roll_number)
+        if cached is not None:
+            return cached
+    
+    result = run_async(get_or_scrape(roll_number), timeout=SCRAPE_TIMEOUT)
+    _cache_set(roll_number, result)
+    return result
+
+async def _gather_scrapes(roll_numbers):
+    return await asyncio.gather(*(get_or_scrape(roll) for roll in roll_numbers), return_exceptions=True)
+
+def get_scrape_results(roll_numbers, fresh=False):
+    """
+    Batch version of get_scrape_result. Cache misses are scraped
+    concurrently across the browser pool. Returns a dict mapping each
+    roll number to its result, or to the exception its scrape raised.
+    """
+    results = {}
+    if not fresh:
+        for roll_number in roll_numbers:
+            cached = _cache_get(roll_number)
+            if cached is not None:
+                results[roll_number] = cached
+    
+    missing = [roll_number for roll_number in roll_numbers if roll_number not in results]
+    if missing:
+        # The pool serves pool.size scrapes at a time
+        timeout = SCRAPE_TIMEOUT * math.ceil(len(missing) / pool.size)
+        for roll_number, result in zip(missing, run_async(_gather_scrapes(missing), timeout=timeout)):
+            if not isinstance(result, Exception):
+                _cache_set(roll_number, result)
+            results[roll_number] = result
+    return results
+
+ERP_LOGIN_URL = 'https://geethanjali-erp.com/GCET/Login.aspx'
+
+# Keep-alive HTTP session for ERP health checks, created on the shared loop
+_http_session = None
+
+async def _get_http_session():
+    global _http_session
+    if _http_session is None:
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=5)
+        )
+    return _http_session
+
+async def check_erp_status():
+    """HEAD the ERP login page over a pooled connection and return the status"""
+    http_session = await _get_http_session()
+    async with http_session.head(ERP_LOGIN_URL, allow_redirects=True) as response:
+        return response.status
+
+async def _warm_up():
+    # Build the health-check session and launch browsers at startup so the
+    # first user request does not pay for either
+    await _get_http_session()
+    try:
+        await pool.start()
+    except Exception as e:
+        logger.warning(f"Browser pool warm-up failed, will retry on first request: {e}")
+
+asyncio.run_coroutine_threadsafe(_warm_up(), app.config['LOOP'])
+
+async def _shutdown():
+    if _http_session is not None:
+        await _http_session.close()
+    await pool.close()
+
+@atexit.register
+def _close_pool():
+    try:
+        run_async(_shutdown(), timeout=10)
+    except Exception as e:
+        logger.warning(f"Error closing browser pool: {e}")
+
+# Seconds browsers may reuse the portal page before revalidating it
+INDEX_MAX_AGE = 60
+
+def _etag_matches(etag):
+    """
+    If-None-Match check that also accepts the ':<encoding>' suffix
+    Flask-Compress appends to the ETags of compressed responses.
+    Returns the client's matching tag (suffix included), or None.
+    """
+    for tag in request.headers.get('If-None-Match', '').split(','):
+        tag = tag.strip().removeprefix('W/').strip('"')
+        if tag == '*':
+            return etag
+        if tag.split(':', 1)[0] == etag:
+            return tag
+    return None
+
 @app.route('/')
 def index():
     """Serve the main attendance portal"""
-    return render_template('index.html')
+    response = make_response(render_template('index.html'))
+    response.add_etag()
+    response.cache_control.public = True
+    response.cache_control.max_age = INDEX_MAX_AGE
+    
+    # Unchanged page: answer reloads with an empty 304
+    etag, _ = response.get_etag()
+    matched_tag = _etag_matches(etag)
+    if matched_tag:
+        # Echo the tag the client cached (e.g. the compressed variant's),
+        # since Flask-Compress leaves 304s alone
+        response.set_etag(matched_tag)
+        response.status_code = 304
+        response.set_data(b'')
+        del response.headers['Content-Length']
+    return response
+
+def _session_hit(roll_number):
+    """Check whether the session holds a recent fetch for this roll number"""
+    return (session.get('last_roll_number') == roll_number
+            and _recent(session.get('last_fetch_time')))
+
+def _store_session_payload(payload):
+    """Remember a fetch endpoint payload in the session"""
+    # Redis sessions keep it serialized so cached reads return the bytes
+    # as-is; signed cookies would base64 bytes, so they get plain JSON
+    session['last_payload'] = orjson.dumps(payload) if REDIS_URL else payload
+
+def _session_payload():
+    """The session's last fetch payload as JSON bytes"""
+    payload = session['last_payload']
+    return payload if isinstance(payload, bytes) else orjson.dumps(payload)
+
+def _scrape_and_process(roll_number, fresh=False, include_raw=False):
+    """
+    Single code path behind /api/fetch-student-data and /scrape: fetch the
+    student through the scrape cache and in-flight table, process the
+    result and remember it in the session.
+    
+    Returns:
+        (body, status) where a successful body is the fetch endpoint's payload
+    """
+    logger.info(f"Fetching data for roll number: {roll_number}")
+    
+    try:
+        # Serve a recent cached scrape or run Playwright with a warm browser
+        result = get_scrape_result(roll_number, fresh=fresh)
+    except Exception as e:
+        logger.error(f"Scraping error for {roll_number}: {e}")
+        return {
+            'success': False,
+            'error': f'Failed to fetch student data: {str(e)}'
+        }, 500
+    
+    if not result.get('success'):
+        return {
+            'success': False,
+            'error': result.get('error', 'Failed to fetch student data')
+        }, 400
+    
+    body = {
+        'success': True,
+        'data': process_student_data(result, include_raw=include_raw),
+        'message': 'Student data fetched successfully'
+    }
+    
+    # Store in session for caching; debug payloads carry the raw scrape,
+    # which is too large for a cookie and must not be served later as a
+    # regular response
+    if not include_raw:
+        fetch_time = datetime.now().isoformat()
+        _store_session_payload({
+            **body,
+            'rollNumber': roll_number,
+            'fetchTime': fetch_time,
+            'cached': True
+        })
+        session['last_roll_number'] = roll_number
+        session['last_fetch_time'] = fetch_time
+    
+    return body, 200
 
 @app.route('/api/fetch-student-data', methods=['POST'])
 def api_fetch_student_data():
     """
     API endpoint to fetch student data using roll number only
     """
+    # Parsed outside the try so an oversize body surfaces as a 413
+    data = json_body()
     try:
-        data = request.get_json()
         roll_number = data.get('rollNumber', '').strip()
         
         if not roll_number:
@@ -49,40 +367,88 @@ def api_fetch_student_data():
                 'error': 'Roll number is required'
             }), 400
         
-        logger.info(f"Fetching data for roll number: {roll_number}")
+        fresh = request.args.get('fresh') == '1'
+        include_raw = request.args.get('debug') == '1'
         
-        # Use asyncio to run the Playwright scraper
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        # Repeat requests for the same student are answered from the session
+        if not fresh and not include_raw and _session_hit(roll_number):
+            return Response(_session_payload(), mimetype='application/json')
         
-        try:
-            result = loop.run_until_complete(scrape_student_data(roll_number))
+        body, status = _scrape_and_process(roll_number, fresh=fresh, include_raw=include_raw)
+        return jsonify(body), status
             
-            if result['success']:
-                # Process the data for frontend
-                processed_data = process_student_data(result)
-                
-                # Store in session for caching
-                session['last_data'] = processed_data
-                session['last_roll_number'] = roll_number
-                session['last_fetch_time'] = datetime.now().isoformat()
-                
-                return jsonify({
+    except Exception as e:
+        logger.error(f"Error fetching student data: {e}")
+        return jsonify({
+            'success': False,
+            'error': f'Failed to fetch student data: {str(e)}'
+        }), 500
+
+@app.route('/api/fetch-student-data/batch', methods=['POST'])
+def api_batch_fetch_student_data():
+    """
+    API endpoint to fetch several students in one request
+    """
+    # Parsed outside the try so an oversize body surfaces as a 413
+    data = json_body()
+    try:
+        roll_numbers = data.get('rollNumbers')
+        
+        if not isinstance(roll_numbers, list) or not roll_numbers:
+            return jsonify({
+                'success': False,
+                'error': 'rollNumbers must be a non-empty list'
+            }), 400
+        
+        if len(roll_numbers) > MAX_BATCH_SIZE:
+            return jsonify({
+                'success': False,
+                'error': f'At most {MAX_BATCH_SIZE} roll numbers can be fetched at once'
+            }), 400
+        
+        roll_numbers = [str(roll_number).strip() for roll_number in roll_numbers]
+        if not all(roll_numbers):
+            return jsonify({
+                'success': False,
+                'error': 'Roll numbers cannot be empty'
+            }), 400
+        
+        logger.info(f"Batch fetching data for {len(roll_numbers)} roll numbers")
+        
+        # Duplicate roll numbers in one batch share a single scrape
+        results = get_scrape_results(list(dict.fromkeys(roll_numbers)), fresh=request.args.get('fresh') == '1')
+        include_raw = request.args.get('debug') == '1'
+        
+        response = []
+        for roll_number in roll_numbers:
+            result = results[roll_number]
+            if isinstance(result, Exception):
+                logger.error(f"Error fetching student data for {roll_number}: {result}")
+                response.append({
+                    'rollNumber': roll_number,
+                    'success': False,
+                    'error': f'Failed to fetch student data: {str(result)}'
+                })
+            elif result['success']:
+                response.append({
+                    'rollNumber': roll_number,
                     'success': True,
-                    'data': processed_data,
-                    'message': 'Student data fetched successfully'
+                    'data': process_student_data(result, include_raw=include_raw)
                 })
             else:
-                return jsonify({
+                response.append({
+                    'rollNumber': roll_number,
                     'success': False,
                     'error': result.get('error', 'Failed to fetch student data')
-                }), 400
-                
-        finally:
-            loop.close()
-            
+                })
+        
+        return jsonify({
+            'success': True,
+            'results': response
+        })
+        
     except Exception as e:
-        logger.error(f"Error fetching student data: {e}")
+        logger.error(f"Error in batch fetch: {e}")
         return jsonify({
             'success': False,
             'error': f'Failed to fetch student data: {str(e)}'
@@ -94,19 +460,18 @@ def api_test_connection():
     Test ERP connection
     """
     try:
-        import requests
-        response = requests.get('https://geethanjali-erp.com/GCET/Login.aspx', timeout=10)
+        status_code = run_async(check_erp_status(), timeout=10)
         
-        if response.status_code == 200:
+        if status_code == 200:
             return jsonify({
                 'success': True,
                 'message': 'ERP system is accessible',
-                'status_code': response.status_code
+                'status_code': status_code
             })
         else:
             return jsonify({
                 'success': False,
-                'message': f'ERP system returned status: {response.status_code}'
+                'message': f'ERP system returned status: {status_code}'
             })
             
     except Exception as e:
@@ -120,8 +485,9 @@ def scrape_attendance():
     """
     Scrape attendance data for the given roll number
     """
+    # Parsed outside the try so an oversize body surfaces as a 413
+    data = json_body()
     try:
-        data = request.get_json()
         roll_number = data.get('roll_number', '').strip()
 
         if not roll_number:
@@ -129,75 +495,34 @@ def scrape_attendance():
                 'error': 'Roll number is required'
             }), 400
 
-        logger.info(f"Scraping attendance for roll number: {roll_number}")
-
-        # Create new event loop for this request
-        try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-            # Pass roll_number directly to scrape_student_data
-            raw_data = loop.run_until_complete(scrape_student_data(roll_number))
+        fresh = request.args.get('fresh') == '1'
 
-            if raw_data and 'attendance' in raw_data:
-                logger.info(f"Successfully scraped data for {roll_number}")
-                attendance_data = raw_data['attendance']
-                
-                # Get the grid data to find current semester totals
-                grid_data = attendance_data.get('grid_data', [])
-                
-                # Find the last "Total" row which represents current semester
-                current_semester_data = None
-                if grid_data:
-                    for row in reversed(grid_data):  # Start from the end
-                        if len(row) >= 4 and row[0] == 'Total':
-                            current_semester_data = row
-                            logger.info(f"Found current semester total row: {row}")
-                            break
-                
-                if current_semester_data:
-                    total_conducted = int(current_semester_data[1])
-                    total_attended = int(current_semester_data[2])
-                    current_percentage = float(current_semester_data[3])
-                    
-                    logger.info(f"Current semester attendance: {total_attended}/{total_conducted} ({current_percentage}%)")
-                else:
-                    # Fallback to overall data if no current semester found
-                    total_conducted = attendance_data.get('total_classes_conducted', 0)
-                    total_attended = attendance_data.get('total_classes_attended', 0)
-                    current_percentage = attendance_data.get('overall_percentage', 0)
-                    
-                    logger.info(f"Using overall attendance: {total_attended}/{total_conducted} ({current_percentage}%)")
-                
-                # Create a single current semester attendance record
-                current_subject = {
-                    'name': 'Current Semester Attendance',
-                    'present': str(total_attended),
-                    'total': str(total_conducted),
-                    'absent': str(total_conducted - total_attended),
-                    'percentage': f"{current_percentage:.2f}"
-                }
-                
-                return jsonify({
-                    'success': True,
-                    'subjects': [current_subject]
-                })
-            else:
+        # Repeat requests for the same student are answered from the session
+        if not fresh and _session_hit(roll_number):
+            student_data = orjson.loads(_session_payload())['data']
+        else:
+            body, status = _scrape_and_process(roll_number, fresh=fresh)
+            if status == 400:
                 logger.warning(f"No attendance data found for roll number: {roll_number}")
                 return jsonify({
                     'success': False,
                     'error': 'No attendance data found. Please check your roll number.'
                 }), 404
+            if status != 200:
+                return jsonify(body), status
+            student_data = body['data']
 
-        except Exception as e:
-            logger.error(f"Scraping error for {roll_number}: {e}")
+        current_subject = student_data.get('currentSemester')
+        if not current_subject:
             return jsonify({
                 'success': False,
-                'error': f'Failed to fetch attendance data: {str(e)}'
+                'error': student_data.get('error', 'Failed to process attendance data')
             }), 500
 
-        finally:
-            loop.close()
+        return jsonify({
+            'success': True,
+            'subjects': [current_subject]
+        })
 
     except Exception as e:
         logger.error(f"Error in scrape endpoint: {e}")
@@ -206,9 +531,45 @@ def scrape_attendance():
             'error': f'Server error: {str(e)}'
         }), 500
 
-def process_student_data(raw_data):
+def current_semester_attendance(attendance_data):
     """
-    Process raw ERP data for frontend consumption
+    Summarise the current semester as a single attendance record.
+    Returns None when the Total row cannot be parsed, so the rest of the
+    student profile is still served.
+    """
+    # Last "Total" row of the grid, located by the scraper while parsing
+    current_semester_data = attendance_data.get('current_semester_total')
+    
+    if current_semester_data:
+        try:
+            total_conducted = int(current_semester_data[1])
+            total_attended = int(current_semester_data[2])
+            current_percentage = float(current_semester_data[3])
+        except (ValueError, IndexError) as e:
+            logger.warning(f"Could not parse current semester total {current_semester_data}: {e}")
+            return None
+        
+        logger.info(f"Current semester attendance: {total_attended}/{total_conducted} ({current_percentage}%)")
+    else:
+        # Fallback to overall data if no current semester found
+        total_conducted = attendance_data.get('total_classes_conducted', 0)
+        total_attended = attendance_data.get('total_classes_attended', 0)
+        current_percentage = attendance_data.get('overall_percentage', 0)
+        
+        logger.info(f"Using overall attendance: {total_attended}/{total_conducted} ({current_percentage}%)")
+    
+    return {
+        'name': 'Current Semester Attendance',
+        'present': str(total_attended),
+        'total': str(total_conducted),
+        'absent': str(total_conducted - total_attended),
+        'percentage': f"{current_percentage:.2f}"
+    }
+
+def process_student_data(raw_data, include_raw=False):
+    """
+    Process raw ERP data for frontend consumption.
+    The raw scraper payload is only echoed back when include_raw is set.
     """
     try:
         student_info = raw_data.get('student_info', {})
@@ -223,33 +584,43 @@ def process_student_data(raw_data):
         semester = student_info.get('semester', 'Unknown')
         
         # Process attendance data
-        attendance_info = process_attendance_info(attendance_data)
+        attendance_info = process_attendance_info(attendance_data, include_raw)
         
         # Process marks data
-        marks_info = process_marks_info(marks_data)
+        marks_info = process_marks_info(marks_data, include_raw)
         
-        return {
+        processed = {
             'name': name,
             'rollNumber': roll_number,
             'branch': branch,
             'year': year,
             'semester': semester,
             'attendance': attendance_info,
+            'currentSemester': current_semester_attendance(attendance_data),
             'marks': marks_info,
             'lastUpdated': raw_data.get('extracted_at', datetime.now().isoformat()),
             'source': 'Live ERP Data (Playwright)',
-            'pageUrl': raw_data.get('page_url', ''),
-            'rawData': raw_data  # Include raw data for debugging
+            'pageUrl': raw_data.get('page_url', '')
         }
+        if include_raw:
+            processed['rawData'] = raw_data  # Include raw data for debugging
+        return processed
         
     except Exception as e:
         logger.error(f"Error processing student data: {e}")
-        return {
-            'error': f'Failed to process data: {str(e)}',
-            'rawData': raw_data
-        }
+        error_info = {'error': f'Failed to process data: {str(e)}'}
+        if include_raw:
+            error_info['rawData'] = raw_data
+        return error_info
 
-def process_attendance_info(attendance_data):
+def _parse_attendance_counts(row):
+    """Return (conducted, attended, percentage) for a month row, or None if not numeric"""
+    try:
+        return int(row[2]), int(row[3]), float(row[4])
+    except ValueError:
+        return None
+
+def process_attendance_info(attendance_data, include_raw=False):
     """Process attendance data"""
     try:
         if not attendance_data:
@@ -272,49 +643,54 @@ def process_attendance_info(attendance_data):
             headers = table_data[0] if table_data else []
             logger.info(f"Processing attendance table with headers: {headers}")
 
-            for row in table_data[1:]:
-                if len(row) >= 5 and row[0] != 'Total':  # Skip total rows and ensure all required fields are present
-                    try:
-                        total_classes_row = int(row[2])
-                        attended_classes_row = int(row[3])
-                        absent_classes = total_classes_row - attended_classes_row
-                        percentage_row = float(row[4])
-                        
-                        subject_info = {
-                            'name': f"{row[0]} ({row[1]})",  # Month and Semester
-                            'present': str(attended_classes_row),
-                            'total': str(total_classes_row),
-                            'absent': str(absent_classes),
-                            'percentage': f"{percentage_row:.2f}"
-                        }
-                        subjects.append(subject_info)
-                        logger.info(f"Added subject: {subject_info['name']} - {subject_info['present']}/{subject_info['total']} ({subject_info['percentage']}%)")
-                    except (ValueError, IndexError) as e:
-                        logger.warning(f"Skipping invalid row: {row} - Error: {e}")
-                        continue
+            # Month rows only - skip total rows and rows missing required fields
+            rows = [row for row in table_data[1:] if len(row) >= 5 and row[0] != 'Total']
+
+            for row, counts in zip(rows, map(_parse_attendance_counts, rows)):
+                if counts is None:
+                    logger.warning(f"Skipping invalid row: {row}")
+                    continue
+                total_classes_row, attended_classes_row, percentage_row = counts
+                
+                subject_info = {
+                    'name': f"{row[0]} ({row[1]})",  # Month and Semester
+                    'present': str(attended_classes_row),
+                    'total': str(total_classes_row),
+                    'absent': str(total_classes_row - attended_classes_row),
+                    'percentage': f"{percentage_row:.2f}"
+                }
+                subjects.append(subject_info)
+                logger.debug("Added subject: %s - %s/%s (%s%%)", subject_info['name'],
+                             subject_info['present'], subject_info['total'], subject_info['percentage'])
 
         logger.info(f"Processed {len(subjects)} attendance records")
-        return {
+        attendance_info = {
             'available': True,
             'summary': {
                 'totalClasses': total_classes,
                 'attendedClasses': attended_classes,
                 'percentage': percentage
             },
-            'subjects': subjects,
-            'tableData': table_data,
-            'raw': attendance_data
+            'subjects': subjects
         }
+        if include_raw:
+            # raw already carries the table as grid_data/table_data
+            attendance_info['raw'] = attendance_data
+        else:
+            attendance_info['tableData'] = table_data
+        return attendance_info
 
     except Exception as e:
         logger.error(f"Error processing attendance: {e}")
-        return {
+        attendance_info = {
             'available': False,
-            'error': str(e),
-            'raw': attendance_data
+            'error': str(e)
         }
+        if include_raw:
+            attendance_info['raw'] = attendance_data
+        return attendance_info
 
-def process_marks_info(marks_data):
+def process_marks_info(marks_data, include_raw=False):
     """Process marks/grades data"""
     try:
         if not marks_data:
@@ -339,20 +715,26 @@ def process_marks_info(marks_data):
                     }
                     subjects.append(subject_info)
         
-        return {
+        marks_info = {
             'available': True,
-            'subjects': subjects,
-            'tableData': table_data,
-            'raw': marks_data
+            'subjects': subjects
         }
+        if include_raw:
+            # raw already carries the table as table_data
+            marks_info['raw'] = marks_data
+        else:
+            marks_info['tableData'] = table_data
+        return marks_info
         
     except Exception as e:
         logger.error(f"Error processing marks: {e}")
-        return {
+        marks_info = {
             'available': False,
-            'error': str(e),
-            'raw': marks_data
+            'error': str(e)
         }
+        if include_raw:
+            marks_info['raw'] = marks_data
+        return marks_info
 
 @app.route('/api/logout', methods=['POST'])
 def api_logout():
@@ -371,14 +753,8 @@ def api_get_cached_data():
     """
     Get cached student data from session
     """
-    if 'last_data' in session:
-        return jsonify({
-            'success': True,
-            'data': session['last_data'],
-            'rollNumber': session.get('last_roll_number'),
-            'fetchTime': session.get('last_fetch_time'),
-            'cached': True
-        })
+    if 'last_payload' in session:
+        return Response(_session_payload(), mimetype='application/json')
     else:
         return jsonify({
             'success': False,
@@ -392,6 +768,13 @@ def not_found(error):
         'error': 'API endpoint not found'
     }), 404
 
+@app.errorhandler(413)
+def request_too_large(error):
+    return jsonify({
+        'success': False,
+        'error': 'Request body too large'
+    }), 413
+
 @app.errorhandler(500)
 def internal_error(error):
     return jsonify({
@@ -400,12 +783,17 @@ def internal_error(error):
     }), 500
 
 if __name__ == '__main__':
+    port = int(os.environ.get('PORT', 5000))
+    # The reloader forks a second process that would start its own browser
+    # pool, so debug mode (and the reloader with it) is opt-in
+    debug = os.environ.get('FLASK_DEBUG') == '1'
+    
     print("🚀 Starting Playwright ERP Integration Server")
     print("=" * 50)
-    print("📡 Server will run at: http://localhost:5000")
+    print(f"📡 Server will run at: http://localhost:{port}")
     print("🤖 Using Playwright for browser automation")
     print("🎯 Single roll number authentication system")
     print("=" * 50)
     
     # Start the Flask development server
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app.run(debug=debug, use_reloader=debug, host='0.0.0.0', port=port, threaded=True)
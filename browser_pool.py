@@ -0,0 +1,118 @@
+"""
+Warm Playwright browser pool shared across scrape requests
+=========================================================
+
+Launching Chromium costs hundreds of milliseconds to several seconds,
+which dominated the latency of every scrape when each request started
+its own browser. The pool keeps a few browsers running for the lifetime
+of the process and hands out a fresh BrowserContext per request, so
+students never share cookies while the expensive launch happens once.
+
+All methods must be awaited on the same event loop.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, Optional
+from playwright.async_api import async_playwright, Browser, BrowserContext, Playwright
+
+logger = logging.getLogger(__name__)
+
+BROWSER_ARGS = ['--no-sandbox', '--disable-dev-shm-usage']
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+VIEWPORT = {"width": 1366, "height": 768}
+
+
+class BrowserPool:
+    def __init__(self, size: int = 2, max_uses: int = 50):
+        """
+        Args:
+            size: Number of browsers kept warm
+            max_uses: Contexts served by a browser before it is recycled
+        """
+        self.size = size
+        self.max_uses = max_uses
+        self._playwright: Optional[Playwright] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._uses: Dict[Browser, int] = {}
+        self._start_lock = asyncio.Lock()
+
+    async def _launch(self) -> Browser:
+        browser = await self._playwright.chromium.launch(headless=True, args=BROWSER_ARGS)
+        self._uses[browser] = 0
+        return browser
+
+    async def start(self):
+        """Start Playwright and fill the pool (no-op once started)"""
+        async with self._start_lock:
+            if self._queue is not None:
+                return
+            try:
+                self._playwright = await async_playwright().start()
+                queue = asyncio.Queue()
+                for _ in range(self.size):
+                    queue.put_nowait(await self._launch())
+                self._queue = queue
+                logger.info(f"Browser pool started with {self.size} browsers")
+            except Exception as e:
+                logger.error(f"Failed to start browser pool: {str(e)}")
+                await self._close_all()
+                raise
+
+    async def acquire(self) -> BrowserContext:
+        """Check out a fresh context, waiting for a free browser if needed"""
+        await self.start()
+        browser = await self._queue.get()
+        try:
+            if not browser.is_connected():
+                logger.info("Pooled browser disconnected, relaunching")
+                self._uses.pop(browser, None)
+                browser = await self._launch()
+            return await browser.new_context(user_agent=USER_AGENT, viewport=VIEWPORT)
+        except Exception:
+            self._queue.put_nowait(browser)
+            raise
+
+    async def release(self, context: BrowserContext):
+        """Close a checked-out context and return its browser to the pool"""
+        browser = context.browser
+        try:
+            await context.close()
+        except Exception as e:
+            logger.warning(f"Error closing browser context: {str(e)}")
+
+        self._uses[browser] = self._uses.get(browser, 0) + 1
+        if self._uses[browser] >= self.max_uses:
+            # Recycle long-lived browsers to keep renderer memory bounded;
+            # acquire() relaunches disconnected browsers on next checkout
+            logger.info("Recycling pooled browser")
+            try:
+                await browser.close()
+            except Exception as e:
+                logger.warning(f"Error closing pooled browser: {str(e)}")
+        self._queue.put_nowait(browser)
+
+    async def close(self):
+        """Close every pooled browser and stop Playwright"""
+        # Wait out a start() in progress so its driver is stopped cleanly
+        async with self._start_lock:
+            await self._close_all()
+
+    async def _close_all(self):
+        for browser in list(self._uses):
+            try:
+                await browser.close()
+            except Exception as e:
+                logger.warning(f"Error closing pooled browser: {str(e)}")
+        self._uses.clear()
+        self._queue = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+pool = BrowserPool(
+    size=int(os.environ.get('ERP_POOL_SIZE', 2)),
+    max_uses=int(os.environ.get('ERP_POOL_MAX_USES', 50))
+)
@@ -4,23 +4,295 @@ Handles two-step login process with browser automation
 """
 
 import asyncio
+import base64
+import copy
+import functools
 import json
 import logging
-from typing import Dict, Any, Optional
-from playwright.async_api import async_playwright, Page, Browser
+import re
+from typing import Dict, Any, List, Optional
+from playwright.async_api import Page, Browser, BrowserContext, Locator, Route
+from playwright.async_api import Error as PWError
 import os
 from datetime import datetime
+from html import unescape
+from urllib.parse import urljoin, urlparse
+from browser_pool import pool, USER_AGENT, VIEWPORT
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+ERP_HOST = "geethanjali-erp.com"
+ATTENDANCE_URL = "https://geethanjali-erp.com/GCET/StudentLogin/Student/StudentOverallAttendance.aspx"
+ATTENDANCE_URL_RE = re.compile(r'StudentOverallAttendance', re.I)
+ATTENDANCE_GRID_CSS = 'table[id*="grdOverallAtt"]'
+
+# Elements that carry login/validation error messages on ERP pages
+ERROR_SELECTORS = (
+    '.error', '.alert-danger', '.text-danger',
+    '[id*="error"]', '[class*="error"]',
+    '[id*="Error"]', '[class*="Error"]',
+    '.message', '.msg',
+    'span[style*="color:red"]', 'span[style*="color: red"]',
+    'div[style*="color:red"]', 'div[style*="color: red"]'
+)
+ERROR_CSS = ', '.join(ERROR_SELECTORS)
+
+# Logout controls only exist once logged in
+LOGOUT_CSS = 'a[href*="logout"], [id*="logout"], [class*="logout"]'
+
+# Password field on the second login step (it might have different names)
+PASSWORD_CSS = ', '.join((
+    'input[name="txtPassword"]',
+    'input[name="txtpassword"]',
+    'input[name="password"]',
+    'input[name="pwd"]',
+    'input[type="password"]'
+))
+
+# Login/submit button on the password page
+LOGIN_BUTTON_CSS = ', '.join((
+    'input[type="submit"]',
+    'input[name="btnLogin"]',
+    'input[name="btnSubmit"]',
+    'button[type="submit"]',
+    'input[value*="Login"]',
+    'input[value*="login"]'
+))
+
+# Student info fields, each resolved with a single comma-joined selector
+STUDENT_INFO_CSS = {
+    'name': '[id*="name"], [class*="name"], .student-name, #lblName, #Name, '
+            '.info-name, [data-field="name"]',
+    'roll_number': '[id*="roll"], [class*="roll"], .roll-number, #lblRoll, #RollNumber, '
+                   '.info-roll, [data-field="roll"]',
+    'branch': '[id*="branch"], [class*="branch"], .branch, #lblBranch, #Branch, '
+              '.info-branch, [data-field="branch"]',
+    'year': '[id*="year"], [class*="year"], .year, #lblYear, #Year, '
+            '.info-year, [data-field="year"]',
+    'semester': '[id*="sem"], [class*="sem"], .semester, #lblSemester, #Semester, '
+                '.info-semester, [data-field="semester"]'
+}
+
+# Scraping only needs documents, scripts and XHRs; everything else just
+# slows down page loads
+BLOCKED_RESOURCE_TYPES = frozenset({'image', 'font', 'media', 'stylesheet'})
+
+# Case-folded text() for case-insensitive XPath contains()
+_LOWER_TEXT = "translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')"
+
+# Navigation targets, each pre-joined into a single CSS selector or
+# XPath union so one query covers every alternative
+ATTENDANCE_LINK_CSS = ', '.join((
+    'a[href*="attendance"]',
+    'a[href*="Attendance"]',
+    'button[id*="attendance"]',
+    '[id*="attendance"]',
+    '[class*="attendance"]'
+))
+ATTENDANCE_LINK_XPATH = ' | '.join((
+    f"//a[contains({_LOWER_TEXT}, 'attendance')]",
+    f"//button[contains({_LOWER_TEXT}, 'attendance')]",
+    f"//div[contains({_LOWER_TEXT}, 'attendance')]",
+    f"//span[contains({_LOWER_TEXT}, 'attendance')]"
+))
+
+MARKS_LINK_CSS = ', '.join((
+    'a[href*="marks"]',
+    'a[href*="result"]',
+    'a[href*="grade"]',
+    'button[id*="marks"]',
+    '[id*="marks"]',
+    '[class*="marks"]',
+    '[class*="result"]'
+))
+MARKS_LINK_XPATH = ' | '.join((
+    f"//a[contains({_LOWER_TEXT}, 'marks')]",
+    f"//a[contains({_LOWER_TEXT}, 'results')]",
+    f"//a[contains({_LOWER_TEXT}, 'grade')]",
+    f"//button[contains({_LOWER_TEXT}, 'marks')]",
+    f"//div[contains({_LOWER_TEXT}, 'marks')]"
+))
+
+DASHBOARD_LINK_CSS = ', '.join((
+    'a[href*="dashboard"]',
+    'a[href*="Dashboard"]',
+    'a[href*="student"]',
+    'a[href*="Student"]'
+))
+# 'dashb' also matches the 'Dashbord' typo, and covers the
+# 'Click Here to go Student Dashboard' link
+DASHBOARD_LINK_XPATH = ' | '.join((
+    f"//a[contains({_LOWER_TEXT}, 'dashb')]",
+    f"//button[contains({_LOWER_TEXT}, 'student dashb')]",
+    f"//div[contains({_LOWER_TEXT}, 'student dashb')]"
+))
+
+ACADEMICS_MENU_CSS = ', '.join((
+    'a[href*="academic"]',
+    'a[href*="Academic"]',
+    '[id*="academic"]',
+    '[class*="academic"]'
+))
+# 'attend' also matches the 'Attendence' typo
+MENU_ATTENDANCE_XPATH = ' | '.join((
+    f"//a[contains({_LOWER_TEXT}, 'attend')]",
+    f"//button[contains({_LOWER_TEXT}, 'overall attend')]",
+    f"//div[contains({_LOWER_TEXT}, 'overall attend')]"
+))
+
+# Any of these means a navigated-to page has something to scrape
+CONTENT_READY_CSS = 'table, #content, .attendance'
+
+# Marks tables, in priority order
+MARKS_TABLE_SELECTORS = (
+    'table[id*="marks"], table[class*="marks"]',
+    'table[id*="grade"], table[class*="grade"]',
+    '.marks-table, .grades-table, .results-table'
+)
+
+_DASHBOARD_TEXT_RE = re.compile(r'dashboard|student', re.I)
+# Link text that may lead to student info when no dashboard link exists
+_DASHBOARD_KWS = re.compile(r'student|dashboard|home|main|portal', re.I)
+_ACADEMIC_TEXT_RE = re.compile(r'academic', re.I)
+
+_DIGIT_RE = re.compile(r'^\d+$')
+_UNSAFE_FILENAME_RE = re.compile(r'[^\w-]')
+_TOTAL_RE = re.compile(r'total', re.I)
+
+_INPUT_TAG_RE = re.compile(r'<input\b[^>]*>', re.I)
+_FORM_TAG_RE = re.compile(r'<form\b[^>]*>', re.I)
+_ATTR_RE = re.compile(r'([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+
+def _tag_attrs(tag: str) -> Dict[str, str]:
+    return {name.lower(): unescape(double or single) for name, double, single in _ATTR_RE.findall(tag)}
+
+def _parse_inputs(html: str) -> List[Dict[str, str]]:
+    """Attributes of every <input> on a page, in document order"""
+    return [_tag_attrs(tag) for tag in _INPUT_TAG_RE.findall(html)]
+
+def _hidden_fields(inputs: List[Dict[str, str]]) -> Dict[str, str]:
+    """WebForms state (__VIEWSTATE, __EVENTVALIDATION, ...) to post back"""
+    return {i['name']: i.get('value', '') for i in inputs
+            if i.get('type', '').lower() == 'hidden' and i.get('name')}
+
+def _form_action(html: str, page_url: str) -> str:
+    form = _FORM_TAG_RE.search(html)
+    action = _tag_attrs(form.group(0)).get('action') if form else None
+    return urljoin(page_url, action) if action else page_url
+
+# Pages reached by searching for links (dashboard, attendance, marks) sit at
+# the same URLs for every student, so once found they are loaded directly.
+# Kept on disk so the search is not repeated after a restart.
+DEEP_LINKS_FILE = os.getenv('ERP_DEEP_LINKS_FILE', 'deep_links.json')
+
+def _load_deep_links() -> Dict[str, str]:
+    try:
+        with open(DEEP_LINKS_FILE) as f:
+            links = json.load(f)
+        return {name: url for name, url in links.items() if isinstance(url, str)}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+_DEEP_LINKS: Dict[str, str] = _load_deep_links()
+
+def _save_deep_links():
+    # Write-then-rename so other workers never read a partial file
+    tmp_path = f"{DEEP_LINKS_FILE}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(_DEEP_LINKS, f)
+        os.replace(tmp_path, DEEP_LINKS_FILE)
+    except OSError as e:
+        logger.warning(f"Could not save deep links: {str(e)}")
+
+async def block_unneeded_requests(route: Route):
+    """Route handler aborting static assets and third-party requests"""
+    request = route.request
+    hostname = urlparse(request.url).hostname or ''
+    # Any host other than the ERP (analytics, ad and font CDNs) is dropped
+    erp_host = hostname == ERP_HOST or hostname.endswith('.' + ERP_HOST)
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or not erp_host:
+        await route.abort()
+    else:
+        await route.continue_()
+
+# Attendance table reader installed on every page, so Chromium compiles
+# it once per document instead of on each evaluate call. Reads the
+# attendance grid, or else the first table with attendance-like rows.
+EXTRACT_ATTENDANCE_JS = r"""
+(() => {
+    const MONTH_RE = /january|february|march|april|may|june|july|august|september|october|november|december/i;
+    const DIGITS_RE = /^\d+$/;
+    window.__extractAttendance = (gridSelector) => {
+        const grid = document.querySelector(gridSelector);
+        if (grid) {
+            const data = [];
+            grid.querySelectorAll('tr').forEach(row => {
+                const rowData = Array.from(row.querySelectorAll('td, th'), cell => {
+                    const text = cell.textContent.trim();
+                    // Filter out very long text (CSS/JS) and empty cells
+                    return text.length > 50 ? '' : text;
+                }).filter(text => text !== '');
+
+                if (rowData.length > 0) {
+                    data.push(rowData);
+                }
+            });
+            if (data.length > 0) {
+                return {source: 'grid_data', rows: data};
+            }
+        }
+
+        // Fallback: first table with reasonable attendance data
+        for (const table of document.querySelectorAll('table')) {
+            const data = [];
+            table.querySelectorAll('tr').forEach(row => {
+                const rowData = Array.from(row.querySelectorAll('td, th'), cell => {
+                    const text = cell.textContent.trim();
+                    // Only include short, meaningful text
+                    if (text.length > 30 || text.includes('font-') || text.includes('css')) {
+                        return '';
+                    }
+                    return text;
+                }).filter(text => text !== '');
+
+                if (rowData.length > 2 && rowData.length < 10) {
+                    // Check if this looks like attendance data
+                    const hasNumbers = rowData.some(cell => DIGITS_RE.test(cell));
+                    const hasPercentage = rowData.some(cell => cell.includes('%'));
+                    const hasMonth = rowData.some(cell => MONTH_RE.test(cell));
+
+                    if (hasNumbers || hasPercentage || hasMonth) {
+                        data.push(rowData);
+                    }
+                }
+            });
+            if (data.length > 0) {
+                return {source: 'table_data', rows: data};
+            }
+        }
+        return null;
+    };
+})();
+"""
+
 class PlaywrightERPScraper:
-    def __init__(self):
+    def __init__(self, context: Optional[BrowserContext] = None):
+        """
+        Args:
+            context: Browser context to scrape in. When omitted, one is
+                checked out from the shared browser pool for the scraper's
+                lifetime.
+        """
         self.login_url = "https://geethanjali-erp.com/GCET/Login.aspx"
-        self.browser: Optional[Browser] = None
+        self.context: Optional[BrowserContext] = context
+        self._pooled_context = context is None
         self.page: Optional[Page] = None
         self.authenticated = False
+        # Debug screenshots and traces cost hundreds of ms each, so they are opt-in
+        self.debug = os.getenv("ERP_SCRAPER_DEBUG") == "1"
         
     async def __aenter__(self):
         """Async context manager entry"""
@@ -32,43 +304,90 @@ class PlaywrightERPScraper:
         await self.close_browser()
     
     async def initialize_browser(self):
-        """Initialize Playwright browser"""
+        """Open a page on a warm browser context"""
         try:
-            self.playwright = await async_playwright().start()
-            # Use Chromium for better compatibility
-            self.browser = await self.playwright.chromium.launch(
-                headless=True,  # Set to True for production web app
-                args=['--no-sandbox', '--disable-dev-shm-usage']
-            )
+            if self.context is None:
+                # Contexts take milliseconds to create against a pooled
+                # browser, versus a full Chromium launch per scrape
+                self.context = await pool.acquire()
             
-            # Create new page with realistic user agent
-            self.page = await self.browser.new_page(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            )
+            # Set up once per context so every page opened in it, including
+            # forks, skips images, fonts, CSS and third-party requests ...
+            await self.context.route("**/*", block_unneeded_requests)
+            
+            # ... and gets the attendance reader on every document it loads
+            await self.context.add_init_script(EXTRACT_ATTENDANCE_JS)
             
-            # Set viewport
-            await self.page.set_viewport_size({"width": 1366, "height": 768})
+            # Pool contexts already carry the user agent and viewport
+            self.page = await self.context.new_page()
+            logger.info("Browser page opened successfully")
             
-            logger.info("Browser initialized successfully")
+            # Record a replayable trace for diagnosing failed logins
+            if self.debug:
+                await self.context.tracing.start(screenshots=True, snapshots=True, sources=False)
             
         except Exception as e:
             logger.error(f"Failed to initialize browser: {str(e)}")
+            # __aexit__ does not run when __aenter__ fails
+            await self.close_browser()
+            raise
+    
+    async def fork(self) -> 'PlaywrightERPScraper':
+        """
+        Second scraper on a new page of this one's logged-in context,
+        opened at the current URL, for navigating in parallel.
+        Close it with close_browser(); the context stays with this scraper.
+        """
+        forked = PlaywrightERPScraper(self.context)
+        forked.page = await self.context.new_page()
+        forked.authenticated = self.authenticated
+        try:
+            await forked.page.goto(self.page.url, wait_until='domcontentloaded', timeout=30000)
+        except Exception:
+            await forked.close_browser()
             raise
+        return forked
     
     async def close_browser(self):
-        """Close browser and cleanup"""
+        """Close the page and hand a pooled context back to the pool"""
         try:
             if self.page:
                 await self.page.close()
-            if self.browser:
-                await self.browser.close()
-            if hasattr(self, 'playwright'):
-                await self.playwright.stop()
-            logger.info("Browser closed successfully")
+            logger.info("Browser page closed successfully")
         except Exception as e:
             logger.error(f"Error closing browser: {str(e)}")
+        finally:
+            # Always return the context, or the pool would shrink for good
+            if self._pooled_context and self.context:
+                await pool.release(self.context)
+                self.context = None
     
     async def login(self, roll_number: str) -> Dict[str, Any]:
+        """
+        Login to ERP, keeping the debug trace only when the login fails
+        
+        Args:
+            roll_number: Student roll number (used as both username and password)
+            
+        Returns:
+            Dict containing success status and any relevant data
+        """
+        result = await self._two_step_login(roll_number)
+        
+        if self.debug:
+            # Roll numbers come from request input; keep them to one safe file name
+            trace_path = None if result['success'] else f"trace-{_UNSAFE_FILENAME_RE.sub('_', roll_number)}.zip"
+            try:
+                # Stopping without a path discards the trace
+                await self.context.tracing.stop(path=trace_path)
+                if trace_path:
+                    logger.info(f"Login trace saved as {trace_path}")
+            except Exception as e:
+                logger.warning(f"Could not stop tracing: {str(e)}")
+        
+        return result
+    
+    async def _two_step_login(self, roll_number: str) -> Dict[str, Any]:
         """
         Login to ERP using roll number as both username and password
         This ERP uses a two-step login process:
@@ -84,208 +403,375 @@ class PlaywrightERPScraper:
         try:
             logger.info(f"Attempting two-step login for roll number: {roll_number}")
             
-            # Navigate to login page
-            await self.page.goto(self.login_url, wait_until='networkidle', timeout=30000)
-            logger.info("Navigated to login page")
-            
-            # Wait for page to load completely
-            await self.page.wait_for_load_state('domcontentloaded')
-            
-            # Take a screenshot for debugging
-            await self.page.screenshot(path='step1_login_page.png')
-            logger.info("Screenshot saved as step1_login_page.png")
-            
-            # STEP 1: Enter username and click Next
-            logger.info("STEP 1: Entering username...")
+            # Two plain HTTP round trips when the ERP plays along; the
+            # browser walks through the login pages otherwise
+            login_result = await self._direct_login(roll_number)
+            if login_result is None:
+                failure = await self._browser_login(roll_number)
+                if failure:
+                    return failure
+                
+                # Judge the page the login produced before leaving it, so
+                # the ERP's own error text reaches the user
+                login_result = await self.verify_login_success(roll_number)
+            if not login_result['success']:
+                return login_result
+            
+            # The attendance grid only renders for a logged-in student, so
+            # reaching it proves the login without a separate check
+            if await self.open_attendance_grid():
+                self.authenticated = True
+                logger.info("Login successful, Overall Attendance page loaded")
+                return {
+                    'success': True,
+                    'message': 'Login successful',
+                    'url': self.page.url,
+                    'roll_number': roll_number
+                }
             
-            # Wait for username field to be available
-            try:
-                await self.page.wait_for_selector('input[name="txtUserName"]', timeout=10000)
-            except:
-                logger.error("Username field not found")
+            # A session the ERP did not accept is redirected back to
+            # Login.aspx (with a ReturnUrl naming the attendance page)
+            if 'login.aspx' in self.page.url.lower():
+                self.authenticated = False
+                logger.info("Redirected to the login page - login failed")
                 return {
                     'success': False,
-                    'error': 'Username field not found on login page',
+                    'error': 'Still on login page - invalid credentials or login failed',
                     'url': self.page.url
                 }
             
-            # Fill username field
-            await self.page.fill('input[name="txtUserName"]', roll_number)
-            logger.info("Username field filled")
-            
-            # Click Next button
-            await self.page.click('input[name="btnNext"]')
-            logger.info("Next button clicked")
-            
-            # Wait for navigation to password page
-            try:
-                await self.page.wait_for_navigation(timeout=15000)
-                logger.info("Navigated to password page")
-            except:
-                # Check if we got an error on the username step
-                error_message = await self.check_for_errors()
-                if error_message:
-                    return {
-                        'success': False,
-                        'error': f'Username validation failed: {error_message}',
-                        'url': self.page.url
-                    }
-                
-                # Continue anyway, maybe the page didn't redirect
-                logger.warning("No navigation detected, continuing...")
-                await self.page.wait_for_timeout(3000)
-            
-            # Take screenshot after step 1
-            await self.page.screenshot(path='step2_password_page.png')
-            logger.info("Screenshot saved as step2_password_page.png")
-            
-            # STEP 2: Enter password
-            logger.info("STEP 2: Entering password...")
-            
-            # Look for password field (it might have different names)
-            password_selectors = [
-                'input[name="txtPassword"]',
-                'input[name="txtpassword"]', 
-                'input[name="password"]',
-                'input[name="pwd"]',
-                'input[type="password"]'
-            ]
-            
-            password_input = None
-            for selector in password_selectors:
-                try:
-                    password_input = await self.page.query_selector(selector)
-                    if password_input:
-                        logger.info(f"Found password field with selector: {selector}")
-                        break
-                except:
-                    continue
+            # Neither the direct load nor the menu showed the grid
+            self.authenticated = True
+            logger.warning("Could not load the Overall Attendance grid")
+            login_result['url'] = self.page.url
+            return login_result
             
-            if not password_input:
-                # Maybe we're still on the first page, check for errors
-                current_url = self.page.url
-                
-                logger.error(f"Password field not found. Current URL: {current_url}")
-                
-                # Check if there are any error messages
+        except Exception as e:
+            logger.error(f"Login error: {str(e)}")
+            return {
+                'success': False,
+                'error': f'Login failed: {str(e)}',
+                'url': self.page.url if self.page else 'unknown'
+            }
+    
+    async def _direct_login(self, roll_number: str) -> Optional[Dict[str, Any]]:
+        """
+        Submit both login steps as plain WebForms POSTs through the
+        context's request API, which shares cookies with the browser
+        
+        Returns:
+            Login result once the password was posted; None when the
+            login pages did not look as expected (the browser flow runs
+            instead, so credentials are never submitted twice)
+        """
+        password_posted = False
+        try:
+            request = self.context.request
+            
+            response = await request.get(self.login_url, timeout=30000)
+            html = await response.text()
+            inputs = _parse_inputs(html)
+            next_button = next((i for i in inputs if i.get('name') == 'btnNext'), None)
+            if not response.ok or not next_button:
+                return None
+            
+            # STEP 1: post the username with the page's WebForms state
+            form = _hidden_fields(inputs)
+            form['txtUserName'] = roll_number
+            form['btnNext'] = next_button.get('value', 'Next')
+            response = await request.post(_form_action(html, response.url), form=form, timeout=15000)
+            html = await response.text()
+            inputs = _parse_inputs(html)
+            password_input = next((i for i in inputs if i.get('type', '').lower() == 'password'), None)
+            submit_buttons = [i for i in inputs if i.get('type', '').lower() == 'submit' and i.get('name')]
+            login_button = next((i for i in submit_buttons if i['name'] in ('btnLogin', 'btnSubmit')
+                                 or 'login' in i.get('value', '').lower()),
+                                submit_buttons[0] if submit_buttons else None)
+            if not response.ok or not password_input or not login_button:
+                return None
+            
+            # STEP 2: post the password the same way
+            form = _hidden_fields(inputs)
+            form[password_input['name']] = roll_number
+            form[login_button['name']] = login_button.get('value', '')
+            password_posted = True
+            response = await request.post(_form_action(html, response.url), form=form, timeout=15000)
+            html = await response.text()
+            
+            # A password field on the response means the login was rejected
+            if not response.ok or any(i.get('type', '').lower() == 'password' for i in _parse_inputs(html)):
+                # Read the ERP's message with the same selectors as the browser flow
+                await self.page.set_content(html, wait_until='domcontentloaded')
                 error_message = await self.check_for_errors()
-                if error_message:
-                    return {
-                        'success': False,
-                        'error': f'Login failed at username step: {error_message}',
-                        'url': current_url
-                    }
-                
+                logger.info(f"Direct form login rejected: {error_message}")
                 return {
                     'success': False,
-                    'error': 'Password field not found - username may be invalid',
-                    'url': current_url,
-                    'debug_info': 'Check if the username is correct'
+                    'error': error_message or 'Still on login page - invalid credentials or login failed',
+                    'url': response.url
                 }
             
-            # Fill password field (same as username)
-            await password_input.fill(roll_number)
-            logger.info("Password field filled")
-            
-            # Look for login/submit button on password page
-            login_button_selectors = [
-                'input[type="submit"]',
-                'input[name="btnLogin"]',
-                'input[name="btnSubmit"]',
-                'button[type="submit"]',
-                'input[value*="Login"]',
-                'input[value*="login"]'
-            ]
-            
-            login_button = None
-            for selector in login_button_selectors:
-                try:
-                    login_button = await self.page.query_selector(selector)
-                    if login_button:
-                        logger.info(f"Found login button with selector: {selector}")
-                        break
-                except:
-                    continue
+            logger.info("Logged in with direct form POSTs")
+            return {
+                'success': True,
+                'message': 'Login successful',
+                'roll_number': roll_number
+            }
             
-            if not login_button:
-                logger.error("Login button not found on password page")
+        except Exception as e:
+            if password_posted:
+                # Retrying in the browser would submit the password again
+                logger.error(f"Direct form login failed after posting the password: {str(e)}")
                 return {
                     'success': False,
-                    'error': 'Login button not found on password page',
+                    'error': f'Login failed: {str(e)}',
+                    'url': self.login_url
+                }
+            logger.warning(f"Direct form login failed, using the browser: {str(e)}")
+            return None
+    
+    async def _browser_login(self, roll_number: str) -> Optional[Dict[str, Any]]:
+        """
+        Walk through both login pages in the browser
+        
+        Returns:
+            Error result when a step fails, otherwise None
+        """
+        # Navigate to login page; the username field wait below covers readiness
+        await self.page.goto(self.login_url, wait_until='domcontentloaded', timeout=30000)
+        logger.info("Navigated to login page")
+        
+        # STEP 1: Enter username and click Next
+        logger.info("STEP 1: Entering username...")
+        
+        # Wait for username field to be available
+        try:
+            await self.page.wait_for_selector('input[name="txtUserName"]', timeout=10000)
+        except PWError:
+            logger.error("Username field not found")
+            return {
+                'success': False,
+                'error': 'Username field not found on login page',
+                'url': self.page.url
+            }
+        
+        # Fill username field
+        await self.page.fill('input[name="txtUserName"]', roll_number)
+        logger.info("Username field filled")
+        
+        # Click Next button; the navigation listener is attached before
+        # the click so a fast postback cannot be missed
+        try:
+            async with self.page.expect_navigation(wait_until='domcontentloaded', timeout=15000):
+                await self.page.click('input[name="btnNext"]')
+            logger.info("Navigated to password page")
+        except PWError:
+            # Check if we got an error on the username step
+            error_message = await self.check_for_errors()
+            if error_message:
+                return {
+                    'success': False,
+                    'error': f'Username validation failed: {error_message}',
                     'url': self.page.url
                 }
-            
-            # Click login button
-            await login_button.click()
-            logger.info("Login button clicked")
-            
-            # Wait for final navigation
+        
+            # Continue anyway, maybe the page didn't redirect; give the
+            # field a last short chance instead of sleeping blindly
+            logger.warning("No navigation detected, continuing...")
             try:
-                await self.page.wait_for_navigation(timeout=15000)
-                logger.info("Navigation detected after password submission")
-            except:
-                logger.info("No navigation detected, checking current page state")
-                await self.page.wait_for_timeout(3000)
-            
-            # Take screenshot after login attempt
-            await self.page.screenshot(path='after_final_login.png')
-            logger.info("Post-login screenshot saved as after_final_login.png")
-            
-            # Check if login was successful
-            login_result = await self.verify_login_success(roll_number)
-            
-            # If login successful, navigate directly to Overall Attendance page
-            if login_result['success']:
-                logger.info("Login successful, now navigating to Overall Attendance page...")
-                attendance_success = await self.navigate_to_overall_attendance()
-                if attendance_success:
-                    logger.info("Successfully navigated to Overall Attendance page")
-                else:
-                    logger.warning("Could not navigate to Overall Attendance page")
-            
-            return login_result
-            
-        except Exception as e:
-            logger.error(f"Login error: {str(e)}")
+                await self.page.wait_for_selector(PASSWORD_CSS, timeout=3000)
+            except Exception:
+                pass
+        
+        # STEP 2: Enter password
+        logger.info("STEP 2: Entering password...")
+        
+        # One query for every known password field name
+        password_input = await self.page.query_selector(PASSWORD_CSS)
+        if password_input:
+            logger.info("Found password field")
+        
+        if not password_input:
+            # Maybe we're still on the first page, check for errors
+            current_url = self.page.url
+        
+            logger.error(f"Password field not found. Current URL: {current_url}")
+        
+            # Check if there are any error messages
+            error_message = await self.check_for_errors()
+            if error_message:
+                return {
+                    'success': False,
+                    'error': f'Login failed at username step: {error_message}',
+                    'url': current_url
+                }
+        
             return {
                 'success': False,
-                'error': f'Login failed: {str(e)}',
-                'url': self.page.url if self.page else 'unknown'
+                'error': 'Password field not found - username may be invalid',
+                'url': current_url,
+                'debug_info': 'Check if the username is correct'
+            }
+        
+        # Fill password field (same as username)
+        await password_input.fill(roll_number)
+        logger.info("Password field filled")
+        
+        # Look for login/submit button on password page
+        login_button = await self.page.query_selector(LOGIN_BUTTON_CSS)
+        if login_button:
+            logger.info("Found login button")
+        
+        if not login_button:
+            logger.error("Login button not found on password page")
+            return {
+                'success': False,
+                'error': 'Login button not found on password page',
+                'url': self.page.url
             }
+        
+        # Click login button and wait for the final navigation
+        try:
+            async with self.page.expect_navigation(wait_until='domcontentloaded', timeout=15000):
+                await login_button.click()
+            logger.info("Navigation detected after password submission")
+        except PWError:
+            logger.info("No navigation detected, checking current page state")
+            # Return as soon as the page shows a logged-in or error state
+            try:
+                await self.page.wait_for_selector(f'{LOGOUT_CSS}, {ERROR_CSS}', timeout=3000)
+            except Exception:
+                pass
+        
+        return None
+    
+    async def _first_visible(self, selector: str, has_text=None) -> Optional[Locator]:
+        """
+        First visible element matching selector (and has_text, if given),
+        or None. Filtering runs in the browser, so hidden or off-page
+        candidates are never clicked.
+        """
+        locator = self.page.locator(selector).filter(has_text=has_text, visible=True).first
+        return locator if await locator.count() else None
+    
+    async def _goto_deep_link(self, name: str) -> bool:
+        """Load a previously discovered page directly, skipping the link search"""
+        url = _DEEP_LINKS.get(name)
+        if not url:
+            return False
+        
+        origin_url = self.page.url
+        try:
+            await self.page.goto(url, wait_until='domcontentloaded', timeout=10000)
+            # A stale link bounces back to the login page
+            if 'login.aspx' not in self.page.url.lower():
+                await self._wait_for_content()
+                logger.info(f"Navigated to {name} page via cached link")
+                return True
+        except Exception as e:
+            logger.info(f"Cached {name} link failed: {str(e)}")
+        
+        logger.info(f"Forgetting cached {name} link {url}")
+        _DEEP_LINKS.pop(name, None)
+        _save_deep_links()
+        # Search for the link from where we started
+        try:
+            await self.page.goto(origin_url, wait_until='domcontentloaded', timeout=10000)
+        except Exception as e:
+            logger.debug(f"Could not return to {origin_url}: {str(e)}")
+        return False
+    
+    def _remember_deep_link(self, name: str, origin_url: str):
+        """Cache the current URL as the page a link search for name found"""
+        url = self.page.url
+        # Postback links keep the URL, which then says nothing about the
+        # page; query strings may carry one student's ids
+        if (url == origin_url or urlparse(url).query or 'login.aspx' in url.lower()
+                or _DEEP_LINKS.get(name) == url):
+            return
+        _DEEP_LINKS[name] = url
+        _save_deep_links()
+        logger.info(f"Cached {name} link {url}")
+    
+    async def _wait_for_content(self):
+        """
+        Wait for the page a navigation click led to. networkidle can hang
+        on pages that keep polling, so wait for the DOM and then briefly
+        for the content we scrape.
+        """
+        await self.page.wait_for_load_state('domcontentloaded')
+        try:
+            await self.page.wait_for_selector(CONTENT_READY_CSS, timeout=5000)
+        except Exception as e:
+            logger.debug(f"Content not found after navigation: {str(e)}")
+    
+    async def _debug_screenshot(self, name: str):
+        """Log a JPEG of the current page as a data URL when debugging"""
+        # The image is tens of KB of base64, so it only goes to DEBUG and
+        # is not captured at all when nothing would log it
+        if not self.debug or not logger.isEnabledFor(logging.DEBUG):
+            return
+        try:
+            # No disk IO; works on read-only container filesystems too
+            image = await self.page.screenshot(type='jpeg', quality=40, full_page=False)
+            logger.debug("Debug screenshot %s (%d bytes): data:image/jpeg;base64,%s",
+                         name, len(image), base64.b64encode(image).decode('ascii'))
+        except Exception as e:
+            logger.warning(f"Could not capture debug screenshot {name}: {str(e)}")
     
     async def check_for_errors(self) -> str:
         """Check for error messages on the current page"""
-        error_selectors = [
-            '.error', '.alert-danger', '.text-danger',
-            '[id*="error"]', '[class*="error"]',
-            '[id*="Error"]', '[class*="Error"]',
-            '.message', '.msg',
-            'span[style*="color:red"]', 'span[style*="color: red"]',
-            'div[style*="color:red"]', 'div[style*="color: red"]'
-        ]
-        
-        error_message = ""
-        for selector in error_selectors:
-            try:
-                error_elements = await self.page.query_selector_all(selector)
-                for error_element in error_elements:
-                    error_text = await error_element.text_content()
-                    if error_text and error_text.strip():
-                        error_message += error_text.strip() + " "
-            except:
-                continue
+        # Every error element's text in one round trip
+        try:
+            error_texts = await self.page.eval_on_selector_all(
+                ERROR_CSS, 'elements => elements.map(e => (e.textContent || "").trim()).filter(Boolean)'
+            )
+        except Exception as e:
+            logger.debug(f"Error reading error messages: {str(e)}")
+            return ""
         
-        return error_message.strip()
+        return " ".join(error_texts)
+    
+    async def page_snapshot(self) -> Dict[str, Any]:
+        """
+        Collect everything verify_login_success needs from the current page
+        (title, error text, logout and welcome indicators) in one round trip
+        """
+        return await self.page.evaluate('''
+            ({errorCss, logoutCss}) => {
+                const textOf = (element) => ((element && element.textContent) || '').trim();
+                
+                // One query, so an element matching several selectors is
+                // reported once, as in check_for_errors
+                const errors = Array.from(document.querySelectorAll(errorCss), textOf).filter(Boolean);
+                
+                const hasLogout = !!document.querySelector(logoutCss)
+                    || Array.from(document.querySelectorAll('a, button')).some(
+                        element => /log ?out/i.test(element.textContent || ''));
+                
+                const welcome = document.querySelector(
+                    '[id*="welcome"], [class*="welcome"], [id*="name"], [class*="name"], .student-name, .user-name')
+                    || Array.from(document.querySelectorAll('span, div')).find(
+                        element => (element.textContent || '').includes('Welcome'));
+                
+                return {
+                    title: document.title,
+                    errorMessage: errors.join(' '),
+                    hasLogout: hasLogout,
+                    welcomeText: textOf(welcome)
+                };
+            }
+        ''', {'errorCss': ERROR_CSS, 'logoutCss': LOGOUT_CSS})
     
     async def verify_login_success(self, roll_number: str) -> Dict[str, Any]:
         """Verify if login was successful"""
         current_url = self.page.url
-        page_title = await self.page.title()
+        snapshot = await self.page_snapshot()
+        page_title = snapshot['title']
         
         logger.info(f"Verifying login success - URL: {current_url}, Title: {page_title}")
         
         # Check for error messages first
-        error_message = await self.check_for_errors()
+        error_message = snapshot['errorMessage']
         if error_message:
             logger.info(f"Found error message: {error_message}")
             return {
@@ -301,54 +787,28 @@ class PlaywrightERPScraper:
             'attendance', 'marks', 'profile', 'main'
         ]
         
-        # Check URL for success indicators
-        url_success = any(indicator.lower() in current_url.lower() for indicator in success_indicators)
+        # Check if we're still on login page (negative indicator)
+        login_indicators = ['login.aspx', '/login', 'signin', 'sign-in']
+        still_on_login = any(indicator.lower() in current_url.lower() for indicator in login_indicators)
+        
+        # Check URL for success indicators; a login page URL can name the
+        # page it returns to (ReturnUrl=...StudentOverallAttendance...)
+        url_success = not still_on_login and any(
+            indicator.lower() in current_url.lower() for indicator in success_indicators)
         
         # Check page title for success indicators  
-        title_success = any(indicator.lower() in page_title.lower() for indicator in success_indicators)
+        title_success = not still_on_login and any(
+            indicator.lower() in page_title.lower() for indicator in success_indicators)
         
         # Look for logout button or user info (indicates successful login)
-        logout_selectors = [
-            'a[href*="logout"], a:contains("Logout"), a:contains("Log out")',
-            'button:contains("Logout"), button:contains("Log out")',
-            '[id*="logout"], [class*="logout"]'
-        ]
-        
-        has_logout = False
-        for selector in logout_selectors:
-            try:
-                logout_element = await self.page.query_selector(selector)
-                if logout_element:
-                    has_logout = True
-                    logger.info(f"Found logout element with selector: {selector}")
-                    break
-            except:
-                continue
+        has_logout = snapshot['hasLogout']
+        if has_logout:
+            logger.info("Found logout element")
         
         # Look for student name or welcome message
-        welcome_selectors = [
-            '[id*="welcome"], [class*="welcome"]',
-            '[id*="name"], [class*="name"]',
-            '.student-name, .user-name',
-            'span:contains("Welcome"), div:contains("Welcome")'
-        ]
-        
-        has_welcome = False
-        for selector in welcome_selectors:
-            try:
-                welcome_element = await self.page.query_selector(selector)
-                if welcome_element:
-                    welcome_text = await welcome_element.text_content()
-                    if welcome_text and welcome_text.strip():
-                        has_welcome = True
-                        logger.info(f"Found welcome/name element: {welcome_text.strip()}")
-                        break
-            except:
-                continue
-        
-        # Check if we're still on login page (negative indicator)
-        login_indicators = ['login.aspx', '/login', 'signin', 'sign-in']
-        still_on_login = any(indicator.lower() in current_url.lower() for indicator in login_indicators)
+        has_welcome = bool(snapshot['welcomeText'])
+        if has_welcome:
+            logger.info(f"Found welcome/name element: {snapshot['welcomeText']}")
         
         # Determine success based on multiple factors
         if url_success or title_success or has_logout or has_welcome:
@@ -406,47 +866,19 @@ class PlaywrightERPScraper:
         try:
             logger.info("Extracting student data...")
             
-            # Wait for page to load completely
-            await self.page.wait_for_load_state('networkidle')
-            
-            # Extract basic student information
-            student_info = {}
-            
-            # Common selectors for student information
-            info_selectors = {
-                'name': ['[id*="name"], [class*="name"], .student-name, #lblName, #Name',
-                         '.info-name, [data-field="name"], span:contains("Name")'],
-                'roll_number': ['[id*="roll"], [class*="roll"], .roll-number, #lblRoll, #RollNumber',
-                               '.info-roll, [data-field="roll"], span:contains("Roll")'],
-                'branch': ['[id*="branch"], [class*="branch"], .branch, #lblBranch, #Branch',
-                          '.info-branch, [data-field="branch"], span:contains("Branch")'],
-                'year': ['[id*="year"], [class*="year"], .year, #lblYear, #Year',
-                        '.info-year, [data-field="year"], span:contains("Year")'],
-                'semester': ['[id*="sem"], [class*="sem"], .semester, #lblSemester, #Semester',
-                            '.info-semester, [data-field="semester"], span:contains("Semester")']
-            }
-            
-            # Extract student information
-            for field, selectors in info_selectors.items():
-                for selector_group in selectors:
-                    for selector in selector_group.split(', '):
-                        try:
-                            element = await self.page.query_selector(selector)
-                            if element:
-                                text = await element.text_content()
-                                if text and text.strip():
-                                    student_info[field] = text.strip()
-                                    break
-                        except:
-                            continue
-                    if field in student_info:
-                        break
-            
-            # Look for attendance data
-            attendance_data = await self.extract_attendance_data()
-            
-            # Look for marks/grades data
-            marks_data = await self.extract_marks_data()
+            # Wait for the data tables rather than for network quiet
+            try:
+                await self.page.wait_for_selector('table[id*="grdOverallAtt"], table[id*="marks"]', timeout=10000)
+            except Exception as e:
+                logger.warning(f"Data tables not found, extracting from current page: {str(e)}")
+            
+            # The three extractions only read the DOM, so overlap their
+            # round trips instead of awaiting them one after another
+            student_info, attendance_data, marks_data = await asyncio.gather(
+                self.extract_student_info(),
+                self.extract_attendance_data(),
+                self.extract_marks_data()
+            )
             
             result = {
                 'success': True,
@@ -467,6 +899,26 @@ class PlaywrightERPScraper:
                 'error': f'Failed to extract data: {str(e)}'
             }
     
+    async def extract_student_info(self) -> Dict[str, Any]:
+        """Extract basic student information using common selectors"""
+        # Resolve every field inside the browser in a single round trip:
+        # the first matching element (in document order) with text wins
+        return await self.page.evaluate('''
+            (fields) => {
+                const info = {};
+                for (const [field, css] of Object.entries(fields)) {
+                    for (const element of document.querySelectorAll(css)) {
+                        const text = element.textContent.trim();
+                        if (text) {
+                            info[field] = text;
+                            break;
+                        }
+                    }
+                }
+                return info;
+            }
+        ''', STUDENT_INFO_CSS)
+    
     async def extract_attendance_data(self) -> Dict[str, Any]:
         """Extract attendance information from the Overall Attendance page"""
         try:
@@ -474,102 +926,27 @@ class PlaywrightERPScraper:
             
             logger.info("Extracting attendance data from Overall Attendance page...")
             
-            # Look specifically for the attendance grid (based on our debug findings)
-            grid_selector = 'table[id*="grdOverallAtt"]'
-            
+            # Look specifically for the attendance grid (based on our debug findings);
+            # it is already rendered once navigation completes
             try:
-                await self.page.wait_for_selector(grid_selector, timeout=10000)
+                await self.page.wait_for_selector(ATTENDANCE_GRID_CSS, timeout=3000)
                 logger.info("Found attendance grid")
-                
-                # Extract the grid data using JavaScript evaluation for better reliability
-                grid_data = await self.page.evaluate('''
-                    () => {
-                        const table = document.querySelector('table[id*="grdOverallAtt"]');
-                        if (!table) return null;
-                        
-                        const rows = Array.from(table.querySelectorAll('tr'));
-                        const data = [];
-                        
-                        rows.forEach((row, index) => {
-                            const cells = Array.from(row.querySelectorAll('td, th'));
-                            const rowData = cells.map(cell => {
-                                const text = cell.textContent.trim();
-                                // Filter out very long text (CSS/JS) and empty cells
-                                return text.length > 50 ? '' : text;
-                            }).filter(text => text !== '');
-                            
-                            if (rowData.length > 0) {
-                                data.push(rowData);
-                            }
-                        });
-                        
-                        return data;
-                    }
-                ''')
-                
-                if grid_data and len(grid_data) > 0:
-                    attendance_data['grid_data'] = grid_data
-                    logger.info(f"Extracted grid data with {len(grid_data)} rows")
-                    
-                    # Process the grid data to extract meaningful attendance information
-                    processed_data = self.process_attendance_grid(grid_data)
-                    attendance_data.update(processed_data)
-                
             except Exception as e:
                 logger.warning(f"Could not find attendance grid: {str(e)}")
+            
+            # Read the grid, or fall back to scanning every table for
+            # attendance-like rows, in a single round trip
+            result = await self.page.evaluate(
+                "(gridSelector) => window.__extractAttendance(gridSelector)", ATTENDANCE_GRID_CSS
+            )
+            
+            if result:
+                attendance_data[result['source']] = result['rows']
+                logger.info(f"Extracted {result['source']} with {len(result['rows'])} rows")
                 
-                # Fallback: Look for any tables with reasonable attendance data
-                tables = await self.page.query_selector_all('table')
-                
-                for table in tables:
-                    try:
-                        # Extract table data with filtering
-                        table_data = await table.evaluate(r'''
-                            (table) => {
-                                const rows = Array.from(table.querySelectorAll('tr'));
-                                const data = [];
-                                
-                                rows.forEach(row => {
-                                    const cells = Array.from(row.querySelectorAll('td, th'));
-                                    const rowData = cells.map(cell => {
-                                        const text = cell.textContent.trim();
-                                        // Only include short, meaningful text
-                                        if (text.length > 30 || text.includes('font-') || text.includes('css')) {
-                                            return '';
-                                        }
-                                        return text;
-                                    }).filter(text => text !== '');
-                                    
-                                    if (rowData.length > 2 && rowData.length < 10) {
-                                        // Check if this looks like attendance data
-                                        const hasNumbers = rowData.some(cell => /^\d+$/.test(cell));
-                                        const hasPercentage = rowData.some(cell => /%/.test(cell));
-                                        const hasMonth = rowData.some(cell => 
-                                            /january|february|march|april|may|june|july|august|september|october|november|december/i.test(cell)
-                                        );
-                                        
-                                        if (hasNumbers || hasPercentage || hasMonth) {
-                                            data.push(rowData);
-                                        }
-                                    }
-                                });
-                                
-                                return data;
-                            }
-                        ''')
-                        
-                        if table_data and len(table_data) > 0:
-                            attendance_data['table_data'] = table_data
-                            logger.info(f"Found fallback table with {len(table_data)} relevant rows")
-                            
-                            # Process this data as well
-                            processed_data = self.process_attendance_grid(table_data)
-                            attendance_data.update(processed_data)
-                            break
-                            
-                    except Exception as e:
-                        logger.debug(f"Error processing table: {str(e)}")
-                        continue
+                # Process the table to extract meaningful attendance information
+                processed_data = self.process_attendance_grid(result['rows'])
+                attendance_data.update(processed_data)
             
             return attendance_data
             
@@ -579,53 +956,71 @@ class PlaywrightERPScraper:
     
     def process_attendance_grid(self, grid_data):
         """Process the raw grid data to extract meaningful attendance metrics"""
+        # The detailed pass re-reads the same grid, so results are memoized
+        # on its contents; rows become tuples to be hashable. Callers get a
+        # deep copy so the nested lists in the cached result stay untouched
+        grid = tuple(tuple(row) for row in grid_data) if grid_data else ()
+        return copy.deepcopy(self._process_attendance_grid_cached(grid))
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=16)
+    def _process_attendance_grid_cached(grid_data):
         processed = {}
         
         if not grid_data or len(grid_data) < 2:
             return processed
         
-        logger.info(f"Processing grid data: {grid_data}")
+        # Formatting the whole grid is only worth it when debugging
+        logger.debug("Processing grid data: %s", grid_data)
         
         # Look for headers to understand the structure
         headers = grid_data[0] if grid_data else []
-        logger.info(f"Grid headers: {headers}")
+        logger.debug("Grid headers: %s", headers)
         
         total_conducted = 0
         total_attended = 0
         monthly_records = []
+        # Bound once rather than looked up for every row and cell
+        digit_match = _DIGIT_RE.match
+        total_search = _TOTAL_RE.search
+        add_record = monthly_records.append
         
         # Process each data row (skip header)
         for row in grid_data[1:]:
-            if len(row) >= 3:  # At least month, conducted, attended
+            # The last "Total" row holds the current semester's totals
+            if len(row) >= 4 and row[0] == 'Total':
+                processed['current_semester_total'] = list(row)
+            
+            # At least month, conducted, attended; "Total" rows are never
+            # monthly records, so skip scanning their cells
+            month_info = row[0] if row and row[0] else ""
+            if len(row) >= 3 and not total_search(month_info):
                 try:
                     # Common patterns: [Month, Semester, Conducted, Attended, Percentage]
                     # or [Month/Semester, Conducted, Attended, Percentage]
                     
-                    month_info = row[0] if row[0] else ""
-                    
                     # Find conducted and attended numbers
                     conducted = 0
                     attended = 0
                     percentage = ""
                     
-                    for cell in row[1:]:  # Skip first column (month)
-                        cell_str = str(cell).strip()
-                        
+                    # Skip first column (month); cells arrive trimmed from the page
+                    for cell in row[1:]:
                         # Look for percentage
-                        if '%' in cell_str:
-                            percentage = cell_str
+                        if '%' in cell:
+                            percentage = cell
                         # Look for numbers that could be conducted/attended
-                        elif cell_str.isdigit():
-                            num = int(cell_str)
+                        elif digit_match(cell):
+                            num = int(cell)
                             if 10 <= num <= 500:  # Reasonable range for class counts
                                 if conducted == 0:
                                     conducted = num
                                 elif attended == 0 and num <= conducted:
                                     attended = num
                     
-                    # Only add if we have valid data and it's not a "Total" row
-                    if conducted > 0 and attended > 0 and "total" not in month_info.lower():
-                        monthly_records.append({
+                    # Only add if we have valid data
+                    if conducted > 0 and attended > 0:
+                        add_record({
                             "month": month_info,
                             "conducted": conducted,
                             "attended": attended,
@@ -633,7 +1028,7 @@ class PlaywrightERPScraper:
                         })
                         total_conducted += conducted
                         total_attended += attended
-                        logger.info(f"Added record: {month_info} - {conducted}/{attended} ({percentage})")
+                        logger.debug("Added record: %s - %d/%d (%s)", month_info, conducted, attended, percentage)
                 
                 except Exception as e:
                     logger.debug(f"Error processing row {row}: {str(e)}")
@@ -657,35 +1052,32 @@ class PlaywrightERPScraper:
         try:
             marks_data = {}
             
-            # Look for marks tables
-            marks_selectors = [
-                'table[id*="marks"], table[class*="marks"]',
-                'table[id*="grade"], table[class*="grade"]',
-                '.marks-table, .grades-table, .results-table'
-            ]
+            # Walk the tables inside the browser and return the first
+            # non-empty one, instead of a round trip per row and cell
+            table_data = await self.page.evaluate('''
+                (selectors) => {
+                    for (const selector of selectors) {
+                        for (const table of document.querySelectorAll(selector)) {
+                            const data = [];
+                            for (const row of table.querySelectorAll('tr')) {
+                                const rowData = Array.from(row.querySelectorAll('td, th'), cell => cell.textContent)
+                                    .filter(text => text)
+                                    .map(text => text.trim());
+                                if (rowData.length > 0) {
+                                    data.push(rowData);
+                                }
+                            }
+                            if (data.length > 0) {
+                                return data;
+                            }
+                        }
+                    }
+                    return null;
+                }
+            ''', MARKS_TABLE_SELECTORS)
             
-            for selector in marks_selectors:
-                tables = await self.page.query_selector_all(selector)
-                
-                for table in tables:
-                    rows = await table.query_selector_all('tr')
-                    table_data = []
-                    
-                    for row in rows:
-                        cells = await row.query_selector_all('td, th')
-                        row_data = []
-                        
-                        for cell in cells:
-                            text = await cell.text_content()
-                            if text:
-                                row_data.append(text.strip())
-                        
-                        if row_data:
-                            table_data.append(row_data)
-                    
-                    if table_data:
-                        marks_data['table_data'] = table_data
-                        break
+            if table_data:
+                marks_data['table_data'] = table_data
             
             return marks_data
             
@@ -693,48 +1085,36 @@ class PlaywrightERPScraper:
             logger.error(f"Error extracting marks data: {str(e)}")
             return {'error': str(e)}
     
+    async def fetch_detailed_attendance(self) -> Optional[Dict[str, Any]]:
+        """Try to get more detailed attendance data (None without an attendance link)"""
+        if await self.navigate_to_attendance():
+            return await self.extract_attendance_data()
+        return None
+    
+    async def fetch_detailed_marks(self) -> Optional[Dict[str, Any]]:
+        """Try to get detailed marks data (None without a marks link)"""
+        if await self.navigate_to_marks():
+            return await self.extract_marks_data()
+        return None
+    
     async def navigate_to_attendance(self) -> bool:
         """Navigate to attendance page if available"""
         try:
-            # Look for attendance links/buttons using XPath for text content
-            attendance_selectors = [
-                'a[href*="attendance"]',
-                'a[href*="Attendance"]', 
-                'button[id*="attendance"]',
-                '[id*="attendance"]',
-                '[class*="attendance"]'
-            ]
-            
-            # Try CSS selectors first
-            for selector in attendance_selectors:
-                try:
-                    links = await self.page.query_selector_all(selector)
-                    for link in links:
-                        await link.click()
-                        await self.page.wait_for_load_state('networkidle')
-                        logger.info("Navigated to attendance page via CSS selector")
-                        return True
-                except:
-                    continue
-            
-            # Try XPath for text-based selection
-            xpath_selectors = [
-                "//a[contains(text(), 'Attendance')]",
-                "//a[contains(text(), 'attendance')]", 
-                "//button[contains(text(), 'Attendance')]",
-                "//div[contains(text(), 'Attendance')]",
-                "//span[contains(text(), 'Attendance')]"
-            ]
+            if await self._goto_deep_link('attendance'):
+                return True
+            origin_url = self.page.url
             
-            for xpath in xpath_selectors:
+            # Try CSS selectors first, then XPath for text-based selection
+            for selector, method in ((ATTENDANCE_LINK_CSS, "CSS selector"), (ATTENDANCE_LINK_XPATH, "XPath")):
                 try:
-                    elements = await self.page.locator(xpath).all()
-                    for element in elements:
-                        await element.click()
-                        await self.page.wait_for_load_state('networkidle')
-                        logger.info("Navigated to attendance page via XPath")
+                    link = await self._first_visible(selector)
+                    if link:
+                        await link.click(timeout=2000)
+                        await self._wait_for_content()
+                        logger.info(f"Navigated to attendance page via {method}")
+                        self._remember_deep_link('attendance', origin_url)
                         return True
-                except:
+                except PWError:
                     continue
             
             return False
@@ -746,48 +1126,21 @@ class PlaywrightERPScraper:
     async def navigate_to_marks(self) -> bool:
         """Navigate to marks/results page if available"""
         try:
-            # Look for marks/results links using various selectors
-            marks_selectors = [
-                'a[href*="marks"]',
-                'a[href*="result"]',
-                'a[href*="grade"]',
-                'button[id*="marks"]',
-                '[id*="marks"]',
-                '[class*="marks"]',
-                '[class*="result"]'
-            ]
-            
-            # Try CSS selectors first
-            for selector in marks_selectors:
-                try:
-                    links = await self.page.query_selector_all(selector)
-                    for link in links:
-                        await link.click()
-                        await self.page.wait_for_load_state('networkidle')
-                        logger.info("Navigated to marks page via CSS selector")
-                        return True
-                except:
-                    continue
-            
-            # Try XPath for text-based selection
-            xpath_selectors = [
-                "//a[contains(text(), 'Marks')]",
-                "//a[contains(text(), 'marks')]",
-                "//a[contains(text(), 'Results')]", 
-                "//a[contains(text(), 'Grade')]",
-                "//button[contains(text(), 'Marks')]",
-                "//div[contains(text(), 'Marks')]"
-            ]
+            if await self._goto_deep_link('marks'):
+                return True
+            origin_url = self.page.url
             
-            for xpath in xpath_selectors:
+            # Try CSS selectors first, then XPath for text-based selection
+            for selector, method in ((MARKS_LINK_CSS, "CSS selector"), (MARKS_LINK_XPATH, "XPath")):
                 try:
-                    elements = await self.page.locator(xpath).all()
-                    for element in elements:
-                        await element.click()
-                        await self.page.wait_for_load_state('networkidle')
-                        logger.info("Navigated to marks page via XPath")
+                    link = await self._first_visible(selector)
+                    if link:
+                        await link.click(timeout=2000)
+                        await self._wait_for_content()
+                        logger.info(f"Navigated to marks page via {method}")
+                        self._remember_deep_link('marks', origin_url)
                         return True
-                except:
+                except PWError:
                     continue
             
             return False
@@ -801,85 +1154,79 @@ class PlaywrightERPScraper:
         try:
             logger.info("Looking for Student Dashboard link...")
             
-            # Take a screenshot to see available options
-            await self.page.screenshot(path='post_login_options.png')
-            logger.info("Screenshot saved as post_login_options.png")
+            if await self._goto_deep_link('dashboard'):
+                return True
+            origin_url = self.page.url
             
-            # Look for Student Dashboard link using various selectors
-            dashboard_selectors = [
-                'a[href*="dashboard"]',
-                'a[href*="Dashboard"]',
-                'a[href*="student"]',
-                'a[href*="Student"]'
-            ]
+            # Take a screenshot to see available options
+            await self._debug_screenshot('post_login_options')
             
-            # Try CSS selectors first
-            for selector in dashboard_selectors:
-                try:
-                    links = await self.page.query_selector_all(selector)
-                    for link in links:
-                        link_text = await link.text_content()
-                        if link_text and ('dashboard' in link_text.lower() or 'student' in link_text.lower()):
-                            logger.info(f"Found dashboard link with text: {link_text}")
-                            await link.click()
-                            await self.page.wait_for_load_state('networkidle')
-                            logger.info("Successfully clicked Student Dashboard link")
-                            return True
-                except:
-                    continue
+            # Try CSS selectors first, all alternatives in one query
+            try:
+                link = await self._first_visible(DASHBOARD_LINK_CSS, has_text=_DASHBOARD_TEXT_RE)
+                if link:
+                    # Reading the text costs a round trip, so only do it when debugging
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Found dashboard link with text: %s", await link.text_content())
+                    await link.click(timeout=2000)
+                    await self._wait_for_content()
+                    logger.info("Successfully clicked Student Dashboard link")
+                    self._remember_deep_link('dashboard', origin_url)
+                    return True
+            except PWError:
+                pass
             
             # Try XPath for text-based selection - looking for "Student Dashboard" specifically
-            xpath_selectors = [
-                "//a[contains(text(), 'Student Dashboard')]",
-                "//a[contains(text(), 'Student Dashbord')]",  # Handle potential typo
-                "//a[contains(text(), 'Click Here to go Student Dashboard')]",
-                "//a[contains(text(), 'Click Here to go Student Dashbord')]",
-                "//a[contains(text(), 'Dashboard')]",
-                "//a[contains(text(), 'dashboard')]",
-                "//button[contains(text(), 'Student Dashboard')]",
-                "//div[contains(text(), 'Student Dashboard')]"
-            ]
-            
-            for xpath in xpath_selectors:
-                try:
-                    elements = await self.page.locator(xpath).all()
-                    for element in elements:
-                        element_text = await element.text_content()
-                        logger.info(f"Found potential dashboard element: {element_text}")
-                        await element.click()
-                        await self.page.wait_for_load_state('networkidle')
-                        logger.info("Successfully navigated to Student Dashboard via XPath")
-                        
-                        # Take screenshot after navigation
-                        await self.page.screenshot(path='student_dashboard.png')
-                        logger.info("Screenshot saved as student_dashboard.png")
-                        return True
-                except Exception as e:
-                    logger.debug(f"XPath selector failed: {xpath}, error: {str(e)}")
-                    continue
+            try:
+                element = await self._first_visible(DASHBOARD_LINK_XPATH)
+                if element:
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Found potential dashboard element: %s", await element.text_content())
+                    await element.click(timeout=2000)
+                    await self._wait_for_content()
+                    logger.info("Successfully navigated to Student Dashboard via XPath")
+                    
+                    # Take screenshot after navigation
+                    await self._debug_screenshot('student_dashboard')
+                    self._remember_deep_link('dashboard', origin_url)
+                    return True
+            except Exception as e:
+                logger.debug(f"XPath selector failed: {DASHBOARD_LINK_XPATH}, error: {str(e)}")
             
             # If no specific dashboard link found, look for any links that might lead to student info
             logger.info("Looking for any student-related navigation links...")
             
-            # Get all links and check their text content
-            all_links = await self.page.query_selector_all('a')
-            for link in all_links:
-                try:
-                    link_text = await link.text_content()
-                    if link_text:
-                        link_text = link_text.strip().lower()
-                        if any(keyword in link_text for keyword in ['student', 'dashboard', 'home', 'main', 'portal']):
-                            logger.info(f"Found potential navigation link: {link_text}")
-                            await link.click()
-                            await self.page.wait_for_load_state('networkidle')
-                            logger.info("Clicked potential student navigation link")
-                            
-                            # Take screenshot
-                            await self.page.screenshot(path='after_navigation.png')
-                            logger.info("Screenshot saved as after_navigation.png")
-                            return True
-                except:
-                    continue
+            # Filter every link's text inside the browser in one round trip
+            match = await self.page.evaluate('''
+                (pattern) => {
+                    const keywords = new RegExp(pattern, 'i');
+                    const links = document.querySelectorAll('a');
+                    for (let index = 0; index < links.length; index++) {
+                        const text = (links[index].textContent || '').trim();
+                        if (keywords.test(text)) {
+                            return {index, text, href: links[index].href};
+                        }
+                    }
+                    return null;
+                }
+            ''', _DASHBOARD_KWS.pattern)
+            
+            if match:
+                logger.debug("Found potential navigation link: %s", match['text'])
+                if urlparse(match['href']).scheme in ('http', 'https'):
+                    # A plain link can be loaded directly, skipping the
+                    # actionability checks a click waits for
+                    await self.page.goto(match['href'], wait_until='domcontentloaded', timeout=30000)
+                else:
+                    # javascript:__doPostBack(...) links only work as clicks
+                    await self.page.locator('a').nth(match['index']).click(timeout=2000)
+                await self._wait_for_content()
+                logger.info("Clicked potential student navigation link")
+                
+                # Take screenshot
+                await self._debug_screenshot('after_navigation')
+                self._remember_deep_link('dashboard', origin_url)
+                return True
             
             logger.warning("No Student Dashboard link found")
             return False
@@ -888,24 +1235,30 @@ class PlaywrightERPScraper:
             logger.error(f"Error navigating to Student Dashboard: {str(e)}")
             return False
 
+    async def open_attendance_grid(self) -> bool:
+        """
+        Load the Overall Attendance page (through the Academics menu when
+        the direct load fails) and wait briefly for its grid
+        """
+        if not await self.navigate_to_overall_attendance():
+            return False
+        try:
+            await self.page.wait_for_selector(ATTENDANCE_GRID_CSS, timeout=5000)
+            return True
+        except PWError as e:
+            logger.info(f"Attendance grid not found: {str(e)}")
+            return False
+    
     async def navigate_to_overall_attendance(self) -> bool:
         """Navigate directly to Overall Attendance page after login"""
         try:
             logger.info("Navigating directly to Overall Attendance page...")
             
-            # Direct URL to Overall Attendance page
-            attendance_url = "https://geethanjali-erp.com/GCET/StudentLogin/Student/StudentOverallAttendance.aspx"
-            
-            # Navigate directly to the attendance page
-            await self.page.goto(attendance_url, wait_until='networkidle', timeout=30000)
-            logger.info(f"Navigated to: {attendance_url}")
-            
-            # Wait for page to load completely
-            await self.page.wait_for_load_state('domcontentloaded')
-            
-            # Take screenshot of attendance page
-            await self.page.screenshot(path='overall_attendance_page.png')
-            logger.info("Screenshot saved as overall_attendance_page.png")
+            # Navigate directly to the attendance page; the grid is server
+            # rendered, so the DOM is all extraction needs. A timeout here
+            # switches to the menu, so a slow ERP gets the full 30 s first
+            await self.page.goto(ATTENDANCE_URL, wait_until='domcontentloaded', timeout=30000)
+            logger.info(f"Navigated to: {ATTENDANCE_URL}")
             
             # Verify we're on the correct page
             current_url = self.page.url
@@ -914,8 +1267,9 @@ class PlaywrightERPScraper:
             logger.info(f"Current URL: {current_url}")
             logger.info(f"Page Title: {page_title}")
             
-            # Check if we successfully reached the attendance page
-            if "StudentOverallAttendance" in current_url or "attendance" in page_title.lower():
+            # Check if we successfully reached the attendance page; only the
+            # path counts, as a login redirect names it in its ReturnUrl
+            if ATTENDANCE_URL_RE.search(urlparse(current_url).path) or "attendance" in page_title.lower():
                 logger.info("Successfully reached Overall Attendance page")
                 return True
             else:
@@ -935,52 +1289,33 @@ class PlaywrightERPScraper:
             logger.info("Attempting navigation through Academics menu...")
             
             # Look for Academics menu/link
-            academics_selectors = [
-                'a[href*="academic"]',
-                'a[href*="Academic"]',
-                '[id*="academic"]',
-                '[class*="academic"]'
-            ]
-            
-            # Try CSS selectors for Academics
-            for selector in academics_selectors:
-                try:
-                    elements = await self.page.query_selector_all(selector)
-                    for element in elements:
-                        element_text = await element.text_content()
-                        if element_text and 'academic' in element_text.lower():
-                            logger.info(f"Found Academics menu: {element_text}")
-                            await element.click()
-                            await self.page.wait_for_timeout(2000)
-                            break
-                except:
-                    continue
+            try:
+                element = await self._first_visible(ACADEMICS_MENU_CSS, has_text=_ACADEMIC_TEXT_RE)
+                if element:
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Found Academics menu: %s", await element.text_content())
+                    await element.click(timeout=2000)
+                    # Wait for the submenu to open rather than a fixed delay
+                    await self.page.locator(MENU_ATTENDANCE_XPATH).first.wait_for(state='visible', timeout=2000)
+            except PWError:
+                pass
             
             # Look for Overall Attendance link
-            attendance_xpath_selectors = [
-                "//a[contains(text(), 'Overall Attendance')]",
-                "//a[contains(text(), 'Overall Attendence')]",  # Handle typo
-                "//a[contains(text(), 'Attendance')]",
-                "//a[contains(text(), 'attendance')]",
-                "//button[contains(text(), 'Overall Attendance')]",
-                "//div[contains(text(), 'Overall Attendance')]"
-            ]
-            
-            for xpath in attendance_xpath_selectors:
-                try:
-                    elements = await self.page.locator(xpath).all()
-                    for element in elements:
-                        element_text = await element.text_content()
-                        logger.info(f"Found attendance link: {element_text}")
-                        await element.click()
-                        await self.page.wait_for_load_state('networkidle')
-                        
-                        # Take screenshot
-                        await self.page.screenshot(path='attendance_via_menu.png')
-                        logger.info("Screenshot saved as attendance_via_menu.png")
-                        return True
-                except:
-                    continue
+            try:
+                element = await self._first_visible(MENU_ATTENDANCE_XPATH)
+                if element:
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Found attendance link: %s", await element.text_content())
+                    # Race the click against the postback to the attendance
+                    # page; returns as soon as that page's DOM is parsed
+                    async with self.page.expect_navigation(url=ATTENDANCE_URL_RE, wait_until='domcontentloaded', timeout=8000):
+                        await element.click(timeout=2000, no_wait_after=True)
+                    
+                    # Take screenshot
+                    await self._debug_screenshot('attendance_via_menu')
+                    return True
+            except PWError:
+                pass
             
             return False
             
@@ -988,17 +1323,30 @@ class PlaywrightERPScraper:
             logger.error(f"Error in fallback navigation: {str(e)}")
             return False
 
-async def scrape_student_data(roll_number: str) -> Dict[str, Any]:
+async def scrape_student_data(roll_number: str, context: Optional[BrowserContext] = None,
+                              browser: Optional[Browser] = None) -> Dict[str, Any]:
     """
     Main function to scrape student data using Playwright
     
     Args:
         roll_number: Student roll number
+        context: Optional browser context to scrape in; one is checked
+            out from the shared browser pool when omitted
+        browser: Optional browser to scrape in when no context is given,
+            so batch callers can launch Chromium once and get a fresh
+            context per student
         
     Returns:
         Dict containing all extracted data
     """
-    async with PlaywrightERPScraper() as scraper:
+    if context is None and browser is not None:
+        context = await browser.new_context(user_agent=USER_AGENT, viewport=VIEWPORT)
+        try:
+            return await scrape_student_data(roll_number, context)
+        finally:
+            await context.close()
+    
+    async with PlaywrightERPScraper(context) as scraper:
         # Login
         login_result = await scraper.login(roll_number)
         
@@ -1009,14 +1357,30 @@ async def scrape_student_data(roll_number: str) -> Dict[str, Any]:
         student_data = await scraper.get_student_data()
         
         if student_data['success']:
-            # Try to get more detailed attendance data
-            if await scraper.navigate_to_attendance():
-                detailed_attendance = await scraper.extract_attendance_data()
-                student_data['detailed_attendance'] = detailed_attendance
+            # Detailed attendance and marks don't depend on each other, so
+            # follow them on two pages of the logged-in context at once
+            try:
+                marks_scraper = await scraper.fork()
+            except Exception as e:
+                # The details are optional; don't fail a scrape that already has its data
+                logger.warning(f"Could not open a second page, fetching details in turn: {str(e)}")
+                marks_scraper = None
             
-            # Try to get detailed marks data
-            if await scraper.navigate_to_marks():
-                detailed_marks = await scraper.extract_marks_data()
+            if marks_scraper:
+                try:
+                    detailed_attendance, detailed_marks = await asyncio.gather(
+                        scraper.fetch_detailed_attendance(),
+                        marks_scraper.fetch_detailed_marks()
+                    )
+                finally:
+                    await marks_scraper.close_browser()
+            else:
+                detailed_attendance = await scraper.fetch_detailed_attendance()
+                detailed_marks = await scraper.fetch_detailed_marks()
+            
+            if detailed_attendance is not None:
+                student_data['detailed_attendance'] = detailed_attendance
+            if detailed_marks is not None:
                 student_data['detailed_marks'] = detailed_marks
         
         return student_data
@@ -1026,8 +1390,11 @@ async def test_scraper():
     """Test function for development"""
     test_roll = "23R11A0590"  # Using provided roll number
     
-    result = await scrape_student_data(test_roll)
-    print(json.dumps(result, indent=2))
+    try:
+        result = await scrape_student_data(test_roll)
+        print(json.dumps(result, indent=2))
+    finally:
+        await pool.close()
 
 if __name__ == "__main__":
     # Run test